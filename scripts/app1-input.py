@@ -2,14 +2,29 @@
 
 from __future__ import annotations
 
+import collections
+import functools
 import hashlib
 import itertools
-import re
+import math
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import pandas as pd
 import streamlit as st
 
+try:
+    # Optional drop-in replacement for re with better worst-case behaviour.
+    import regex as re
+except ImportError:
+    import re
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_WRITE_WORKERS = 8
+MAX_PENDING_WRITES = 2 * MAX_WRITE_WORKERS
+
 
 def init_session_state() -> None:
     """Initialise the counters used for dynamic text areas."""
@@ -22,30 +37,60 @@ def init_session_state() -> None:
 
 
 def store_uploaded_template(uploaded_file) -> None:
-    """Store the uploaded template content and its temporary path."""
+    """Store the uploaded template bytes and its temporary path.
 
-    file_bytes = uploaded_file.getvalue()
-    file_hash = hashlib.md5(file_bytes).hexdigest()
+    The upload is hashed and written to disk in a single chunked pass;
+    decoding is deferred to :func:`load_template_text`.
+    """
 
-    if st.session_state.get("template_hash") == file_hash:
+    # Streamlit reruns the script on every interaction; skip hashing when the
+    # uploader still holds the same file.
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None and st.session_state.get("template_file_id") == file_id:
         return
 
-    try:
-        template_text = file_bytes.decode("utf-8")
-        encoding = "utf-8"
-    except UnicodeDecodeError:
-        template_text = file_bytes.decode("cp932", errors="replace")
-        encoding = "cp932"
-
     temp_dir = Path(tempfile.mkdtemp(prefix="inp_template_"))
     template_path = temp_dir / uploaded_file.name
-    template_path.write_bytes(file_bytes)
+    hasher = hashlib.blake2b(digest_size=16)
 
-    st.session_state.template_content = template_text
+    uploaded_file.seek(0)
+    with template_path.open("wb") as handle:
+        while chunk := uploaded_file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            handle.write(chunk)
+
+    file_hash = hasher.hexdigest()
+    st.session_state.template_file_id = file_id
+
+    if st.session_state.get("template_hash") == file_hash:
+        # Same content under a new upload: keep the existing copy.
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    st.session_state.template_bytes = uploaded_file.getvalue()
     st.session_state.template_path = str(template_path)
     st.session_state.template_name = uploaded_file.name
     st.session_state.template_hash = file_hash
-    st.session_state.template_encoding = encoding
+    st.session_state.pop("template_content", None)
+    st.session_state.pop("template_encoding", None)
+
+
+def load_template_text():
+    """Decode the stored template on first use and return ``(text, encoding)``."""
+
+    if "template_content" not in st.session_state:
+        file_bytes = st.session_state.template_bytes
+        try:
+            template_text = file_bytes.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            template_text = file_bytes.decode("cp932", errors="replace")
+            encoding = "cp932"
+
+        st.session_state.template_content = template_text
+        st.session_state.template_encoding = encoding
+
+    return st.session_state.template_content, st.session_state.template_encoding
 
 
 def ensure_replacement_counter(target_index: int) -> None:
@@ -138,68 +183,195 @@ def collect_targets_and_replacements():
     return targets
 
 
-def build_combinations(target_definitions):
-    """Create the Cartesian product of all replacement candidates."""
+class LazyCartesian:
+    """Indexable view over the Cartesian product of replacement candidates.
 
-    if not target_definitions:
-        return []
+    Combinations are built on demand, so only the ones that are actually
+    iterated over or indexed are ever materialised.
+    """
 
-    replacement_lists = [target["replacements"] for target in target_definitions]
-    combinations = []
+    def __init__(self, target_definitions):
+        self.target_definitions = list(target_definitions)
+        self._sizes = [len(target["replacements"]) for target in self.target_definitions]
+        self._length = math.prod(self._sizes) if self._sizes else 0
 
-    for product in itertools.product(*replacement_lists):
-        label = "-".join(str(item["index"]) for item in product)
-        combinations.append(
-            {
-                "label": label,
-                "pairs": [
-                    {
-                        "target": target_definitions[idx],
-                        "replacement": product[idx],
-                    }
-                    for idx in range(len(product))
-                ],
-            }
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int):
+        product = [
+            target["replacements"][digit]
+            for target, digit in zip(self.target_definitions, self._digits(index))
+        ]
+        return self._combination(product)
+
+    def label(self, index: int) -> str:
+        """Return the label of a combination without building its pairs."""
+
+        return "-".join(
+            str(target["replacements"][digit]["index"])
+            for target, digit in zip(self.target_definitions, self._digits(index))
         )
 
-    return combinations
+    def _digits(self, index: int):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("combination index out of range")
+
+        # Decode the mixed-radix index, the last target varying fastest.
+        digits = [0] * len(self._sizes)
+        for axis in range(len(self._sizes) - 1, -1, -1):
+            index, digits[axis] = divmod(index, self._sizes[axis])
+        return digits
+
+    def __iter__(self):
+        if not self._length:
+            return
+        replacement_lists = [target["replacements"] for target in self.target_definitions]
+        for product in itertools.product(*replacement_lists):
+            yield self._combination(product)
+
+    def _combination(self, product):
+        return {
+            "label": "-".join(str(item["index"]) for item in product),
+            "pairs": [
+                {
+                    "target": self.target_definitions[idx],
+                    "replacement": product[idx],
+                }
+                for idx in range(len(product))
+            ],
+        }
+
+
+def freeze_targets(target_definitions):
+    """Convert target definitions into a hashable tuple-of-tuples form."""
+
+    return tuple(
+        (
+            target["target_index"],
+            target["text"],
+            tuple(
+                (replacement["index"], replacement["text"])
+                for replacement in target["replacements"]
+            ),
+        )
+        for target in target_definitions
+    )
+
+
+def build_combinations(frozen_targets):
+    """Create a lazy Cartesian product of all replacement candidates.
+
+    ``frozen_targets`` is the output of :func:`freeze_targets`. Building the
+    view is cheap, so it is not cached; :func:`build_combination_table`, which
+    walks every combination, is.
+    """
+
+    target_definitions = [
+        {
+            "target_index": target_index,
+            "text": target_text,
+            "replacements": [
+                {"index": index, "text": text} for index, text in replacements
+            ],
+        }
+        for target_index, target_text, replacements in frozen_targets
+    ]
+    return LazyCartesian(target_definitions)
 
 
 def combinations_to_table(combinations):
-    """Convert combinations into a structure suitable for display."""
+    """Convert combinations into a column-wise DataFrame for display."""
 
-    rows = []
+    labels = []
+    target_columns = {}
     for combo in combinations:
-        row = {"組み合わせ番号": combo["label"]}
+        labels.append(combo["label"])
         for pair in combo["pairs"]:
             target_idx = pair["target"]["target_index"]
-            row[f"対象({target_idx})"] = pair["target"]["text"]
-            row[f"置換({target_idx})"] = pair["replacement"]["text"]
-        rows.append(row)
-    return rows
+            target_columns.setdefault(f"対象({target_idx})", []).append(pair["target"]["text"])
+            target_columns.setdefault(f"置換({target_idx})", []).append(
+                pair["replacement"]["text"]
+            )
+    return pd.DataFrame({"組み合わせ番号": labels, **target_columns})
+
+
+@st.cache_data(show_spinner=False)
+def build_combination_table(frozen_targets):
+    """Build the display table for the given frozen target definitions."""
+
+    return combinations_to_table(build_combinations(frozen_targets))
+
+
+def compile_target_pattern(target_texts, search_mode: str):
+    """Compile a single alternation pattern matching every target text.
+
+    Each target is captured by a named group ``g<index>`` so that the matching
+    target can be recovered from ``match.lastgroup``. Targets may be given as
+    ``str`` or, for byte-level replacement, as ``bytes``.
+    """
+
+    flags = 0 if search_mode == "完全一致" else re.IGNORECASE
+    if target_texts and isinstance(target_texts[0], bytes):
+        source = b"|".join(
+            b"(?P<g%d>%s)" % (idx, re.escape(text)) for idx, text in enumerate(target_texts)
+        )
+    else:
+        source = "|".join(
+            f"(?P<g{idx}>{re.escape(text)})" for idx, text in enumerate(target_texts)
+        )
+    return re.compile(source, flags)
+
 
+def make_replacer(base_text, target_texts, search_mode: str, encoding=None):
+    """Specialise the replacement of fixed targets within ``base_text``.
 
-def apply_replacements(base_text: str, combo_pairs, search_mode: str):
-    """Apply all replacements for a single combination."""
+    Everything that only depends on the targets (encoding, pattern
+    compilation, single-target match counts) is done once here. The returned
+    function takes the replacement texts of one combination, in target order,
+    and returns ``(updated_text, counts)``. When ``encoding`` is given,
+    ``base_text`` is ``bytes`` and the targets and replacements are encoded
+    with it.
+    """
 
-    updated_text = base_text
-    counts = []
+    if encoding is not None:
+        target_texts = [text.encode(encoding) for text in target_texts]
 
-    for pair in combo_pairs:
-        target_text = pair["target"]["text"]
-        replacement_text = pair["replacement"]["text"]
+    if search_mode == "完全一致" and len(target_texts) == 1:
+        # A single literal target does not need the regex engine, and its
+        # match count is the same for every combination.
+        target = target_texts[0]
+        start = base_text.find(target)
+        count = base_text.count(target, start) if start >= 0 else 0
 
-        if search_mode == "完全一致":
-            count = updated_text.count(target_text)
-            updated_text = updated_text.replace(target_text, replacement_text)
-        else:
-            # Case-insensitive partial matching using regular expressions.
-            pattern = re.compile(re.escape(target_text), re.IGNORECASE)
-            updated_text, count = pattern.subn(replacement_text, updated_text)
+        def replace_single(replacement_texts):
+            if not count:
+                return base_text, [0]
+            replacement = replacement_texts[0]
+            if encoding is not None:
+                replacement = replacement.encode(encoding)
+            return base_text.replace(target, replacement), [count]
 
-        counts.append(count)
+        return replace_single
 
-    return updated_text, counts
+    pattern = compile_target_pattern(target_texts, search_mode)
+
+    def replace_all(replacement_texts):
+        if encoding is not None:
+            replacement_texts = [text.encode(encoding) for text in replacement_texts]
+        counts = [0] * len(target_texts)
+
+        def substitute(match):
+            idx = int(match.lastgroup[1:])
+            counts[idx] += 1
+            return replacement_texts[idx]
+
+        updated_text, _ = pattern.subn(substitute, base_text)
+        return updated_text, counts
+
+    return replace_all
 
 
 def generate_files(
@@ -208,26 +380,95 @@ def generate_files(
     output_directory,
     search_mode,
     encoding,
+    template_bytes=None,
 ):
-    """Generate .inp files for all selected combinations."""
+    """Generate .inp files for all selected combinations.
+
+    ``template_bytes`` may hold the raw uploaded bytes of ``template_content``;
+    the exact-match byte path then uses them as-is instead of re-encoding.
+    """
 
     successful = 0
     skipped = []
     base_name = Path(st.session_state.template_name).stem
 
-    for combo in selected_combinations:
-        updated_text, counts = apply_replacements(
-            template_content, combo["pairs"], search_mode
-        )
-
-        if any(count == 0 for count in counts):
-            skipped.append(combo["label"])
-            continue
+    if not selected_combinations:
+        return successful, skipped
 
-        output_name = f"{base_name}_({combo['label']}).inp"
-        output_path = output_directory / output_name
-        output_path.write_text(updated_text, encoding=encoding)
-        successful += 1
+    # Exact matches can be replaced on the encoded bytes, skipping the codec
+    # for every output file. This is only safe when a byte match is always a
+    # character match: UTF-8 guarantees it, other encodings only for ASCII text.
+    use_bytes = search_mode == "完全一致" and (
+        encoding == "utf-8" or template_content.isascii()
+    )
+    if use_bytes:
+        # The upload decoded losslessly in this case, so its raw bytes equal
+        # the encoded text.
+        if template_bytes is None:
+            template_bytes = template_content.encode(encoding)
+        base_content = template_bytes
+        byte_encoding = encoding
+    else:
+        base_content = template_content
+        byte_encoding = None
+
+    # Every combination shares the same targets.
+    target_texts = [pair["target"]["text"] for pair in selected_combinations[0]["pairs"]]
+    # Matches depend only on the targets, so a target absent from the template
+    # means every combination would be skipped; bail out before rendering.
+    if search_mode == "完全一致" and any(
+        (text.encode(encoding) if use_bytes else text) not in base_content
+        for text in target_texts
+    ):
+        skipped.extend(combo["label"] for combo in selected_combinations)
+        return successful, skipped
+
+    replacer = make_replacer(base_content, target_texts, search_mode, byte_encoding)
+    if use_bytes:
+        write_output = Path.write_bytes
+    else:
+        write_output = functools.partial(Path.write_text, encoding=encoding)
+    # Combinations with identical replacement texts render to the same output.
+    # Only repeated keys are cached, and each entry is evicted after its last
+    # use so that at most the duplicated outputs are held at once.
+    replacement_keys = [
+        tuple(pair["replacement"]["text"] for pair in combo["pairs"])
+        for combo in selected_combinations
+    ]
+    remaining_uses = collections.Counter(replacement_keys)
+    rendered_cache: dict[tuple, tuple] = {}
+
+    # Writes are independent I/O, so they overlap with rendering the next combination.
+    with ThreadPoolExecutor(max_workers=min(MAX_WRITE_WORKERS, len(selected_combinations))) as pool:
+        pending_writes = collections.deque()
+
+        for combo, replacement_texts in zip(selected_combinations, replacement_keys):
+            remaining_uses[replacement_texts] -= 1
+            if replacement_texts in rendered_cache:
+                updated_text, counts = rendered_cache[replacement_texts]
+            else:
+                updated_text, counts = replacer(replacement_texts)
+            if remaining_uses[replacement_texts]:
+                rendered_cache[replacement_texts] = (updated_text, counts)
+            else:
+                rendered_cache.pop(replacement_texts, None)
+
+            if any(count == 0 for count in counts):
+                skipped.append(combo["label"])
+                continue
+
+            output_name = f"{base_name}_({combo['label']}).inp"
+            output_path = output_directory / output_name
+            # Bound the queued writes, each of which holds a full output.
+            if len(pending_writes) >= MAX_PENDING_WRITES:
+                pending_writes.popleft().result()
+                successful += 1
+            pending_writes.append(pool.submit(write_output, output_path, updated_text))
+
+        while pending_writes:
+            # Re-raise any write error on the calling thread.
+            pending_writes.popleft().result()
+            successful += 1
 
     return successful, skipped
 
@@ -245,14 +486,14 @@ def main():
         store_uploaded_template(uploaded_file)
         st.success(f"テンプレート '{uploaded_file.name}' を読み込みました。")
 
-    if "template_content" not in st.session_state:
+    if "template_bytes" not in st.session_state:
         st.info("テンプレートファイルをアップロードしてください。")
         return
 
     render_target_inputs()
 
-    targets = collect_targets_and_replacements()
-    combinations = build_combinations(targets)
+    frozen_targets = freeze_targets(collect_targets_and_replacements())
+    combinations = build_combinations(frozen_targets)
 
     st.subheader("(Ⅳ) 置換の組み合わせ設定と出力")
 
@@ -260,36 +501,42 @@ def main():
         st.info("置換対象と置換後テキストを入力してください。")
         return
 
-    table_rows = combinations_to_table(combinations)
-    if table_rows:
-        st.dataframe(table_rows, use_container_width=True)
+    table = build_combination_table(frozen_targets)
+    if not table.empty:
+        st.dataframe(table, use_container_width=True)
 
-    selected_combinations = []
+    selected_indices = []
     st.write("生成対象の組み合わせを選択してください。")
 
-    for combo in combinations:
-        key = f"combo_select_{combo['label']}"
+    # Only labels are needed for the checkboxes; pairs are built for the
+    # selected combinations alone.
+    for index in range(len(combinations)):
+        label = combinations.label(index)
+        key = f"combo_select_{label}"
         default_value = st.session_state.get(key, True)
         selected = st.checkbox(
-            f"組み合わせ {combo['label']}",
+            f"組み合わせ {label}",
             value=default_value,
             key=key,
         )
         if selected:
-            selected_combinations.append(combo)
+            selected_indices.append(index)
 
-    if not selected_combinations:
+    if not selected_indices:
         st.warning("少なくとも1つの組み合わせを選択してください。")
         return
 
     if st.button("Generate inputs", type="primary"):
+        selected_combinations = [combinations[index] for index in selected_indices]
         output_directory = Path(st.session_state.template_path).parent
+        template_content, encoding = load_template_text()
         successful, skipped = generate_files(
             selected_combinations,
-            st.session_state.template_content,
+            template_content,
             output_directory,
             st.session_state.search_mode,
-            st.session_state.get("template_encoding", "utf-8"),
+            encoding,
+            st.session_state.template_bytes,
         )
 
         if successful:
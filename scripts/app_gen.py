@@ -16,12 +16,19 @@ import argparse
 import csv
 import logging
 import os
-import re
 import sys
 
+try:
+    # The third-party regex module is a drop-in replacement with better
+    # worst-case behaviour on very long inputs; fall back to re otherwise.
+    import regex as re
+except ImportError:
+    import re
+
 
 LOGGER = logging.getLogger(__name__)
 TOKEN_PATTERN = re.compile(r"\{\{([A-Za-z0-9_]+)\}\}")
+UNSAFE_NAME_PATTERN = re.compile(r'[^A-Za-z0-9_-]+')
 DEFAULT_NAME_CANDIDATES = [
     "job_name",
     "JOB_NAME",
@@ -30,6 +37,8 @@ DEFAULT_NAME_CANDIDATES = [
     "CASE",
     "Case",
 ]
+# Single-entry cache of the most recently compiled template text.
+_COMPILED_TEMPLATE_CACHE = {}
 
 
 def configure_logging(verbose):
@@ -49,39 +58,105 @@ def load_template(path):
 
 
 def read_parameter_table(path):
-    """Load CSV parameter table into a list of dictionaries."""
+    """Load CSV parameter table into its header and a list of row tuples."""
     LOGGER.debug('Reading parameter table from {0}'.format(path))
     with open(path, 'r') as handle:
-        reader = csv.DictReader(handle)
-        rows = [row for row in reader]
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        # Blank lines are skipped, matching csv.DictReader.
+        rows = [tuple(row) for row in reader if row]
     if not rows:
         raise ValueError('Parameter table {0} is empty.'.format(path))
     LOGGER.info('Loaded {0} parameter sets from {1}'.format(len(rows), path))
-    return rows
+    return header, rows
 
 
-def render_template(template_text, parameters):
-    """Replace {{TOKEN}} entries with values from the provided parameters."""
-    missing_keys = []
+def index_columns(header):
+    """Map each column name to its position, later duplicates taking precedence."""
+    return dict((name, position) for position, name in enumerate(header))
+
+
+def compile_template(template_text):
+    """Split the template into literal segments and the tokens between them.
+
+    Returns ``(segments, tokens, required)``. The segments list always holds
+    one more entry than the tokens list, so segment ``i`` precedes token ``i``
+    and the last segment is the trailing text after the final token.
+    ``required`` lists each distinct token once, in order of first use.
+    """
+    if '{{' not in template_text:
+        # Plain substring check avoids the regex engine for token-free text.
+        return [template_text], [], []
+    segments = []
+    tokens = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(template_text):
+        segments.append(template_text[position:match.start()])
+        tokens.append(match.group(1))
+        position = match.end()
+    segments.append(template_text[position:])
+
+    # Remove duplicates while preserving order.
+    seen = set()
+    required = []
+    for token in tokens:
+        if token not in seen:
+            required.append(token)
+            seen.add(token)
+    return segments, tokens, required
 
-    def replace(match):
-        token = match.group(1)
-        if token not in parameters or parameters[token] is None:
-            missing_keys.append(token)
-            return match.group(0)
-        return str(parameters[token])
 
-    rendered = TOKEN_PATTERN.sub(replace, template_text)
+def apply_template(compiled, parameters):
+    """Render a template compiled by compile_template with the given parameters."""
+    segments, tokens, required = compiled
+    missing_keys = [token for token in required
+                    if token not in parameters or parameters[token] is None]
     if missing_keys:
-        # Remove duplicates while preserving order.
-        seen = set()
-        ordered_missing = []
-        for key in missing_keys:
-            if key not in seen:
-                ordered_missing.append(key)
-                seen.add(key)
-        raise KeyError('Missing parameters for tokens: {0}'.format(', '.join(ordered_missing)))
-    return rendered
+        raise KeyError('Missing parameters for tokens: {0}'.format(', '.join(missing_keys)))
+
+    parts = [segments[0]]
+    for token, segment in zip(tokens, segments[1:]):
+        parts.append(str(parameters[token]))
+        parts.append(segment)
+    return ''.join(parts)
+
+
+def bind_template(compiled, header):
+    """Resolve the tokens of a compiled template to parameter table columns.
+
+    Tokens without a matching column resolve to ``None`` and are reported as
+    missing by apply_row.
+    """
+    segments, tokens, required = compiled
+    column_index = index_columns(header)
+    columns = [column_index.get(token) for token in tokens]
+    required_columns = [(token, column_index.get(token)) for token in required]
+    return segments, columns, required_columns
+
+
+def apply_row(bound, row):
+    """Render a template bound by bind_template with a positional table row."""
+    segments, columns, required_columns = bound
+    missing_keys = [token for token, position in required_columns
+                    if position is None or position >= len(row)]
+    if missing_keys:
+        raise KeyError('Missing parameters for tokens: {0}'.format(', '.join(missing_keys)))
+
+    parts = [segments[0]]
+    for position, segment in zip(columns, segments[1:]):
+        parts.append(row[position])
+        parts.append(segment)
+    return ''.join(parts)
+
+
+def render_template(template_text, parameters):
+    """Replace {{TOKEN}} entries with values from the provided parameters."""
+    compiled = _COMPILED_TEMPLATE_CACHE.get(template_text)
+    if compiled is None:
+        compiled = compile_template(template_text)
+        _COMPILED_TEMPLATE_CACHE.clear()
+        _COMPILED_TEMPLATE_CACHE[template_text] = compiled
+    return apply_template(compiled, parameters)
 
 
 def ensure_directory(path):
@@ -93,9 +168,29 @@ def ensure_directory(path):
 
 def determine_job_name(parameters, index):
     """Determine the output job name based on parameter values or fallback."""
-    for key in DEFAULT_NAME_CANDIDATES:
-        if key in parameters and parameters[key]:
-            name = parameters[key].strip()
+    candidates = ((key, parameters.get(key)) for key in DEFAULT_NAME_CANDIDATES)
+    return choose_job_name(candidates, index)
+
+
+def resolve_name_columns(header):
+    """Return ``(key, position)`` for each job name candidate present in the header."""
+    column_index = index_columns(header)
+    return [(key, column_index[key]) for key in DEFAULT_NAME_CANDIDATES
+            if key in column_index]
+
+
+def determine_row_job_name(name_columns, row, index):
+    """Determine the job name for a positional row using resolve_name_columns output."""
+    candidates = ((key, row[position]) for key, position in name_columns
+                  if position < len(row))
+    return choose_job_name(candidates, index)
+
+
+def choose_job_name(candidates, index):
+    """Pick the first non-blank ``(key, value)`` candidate as job name or fall back."""
+    for key, value in candidates:
+        if value:
+            name = value.strip()
             if name:
                 LOGGER.debug('Using parameter {0} value {1} as job name.'.format(key, name))
                 return sanitize_job_name(name)
@@ -106,15 +201,14 @@ def determine_job_name(parameters, index):
 
 def sanitize_job_name(name):
     """Sanitize a job name to contain only safe filesystem characters."""
-    safe = re.sub(r'[^A-Za-z0-9_-]+', '_', name)
+    safe = UNSAFE_NAME_PATTERN.sub('_', name)
     if not safe:
         safe = 'case_000'
     return safe
 
 
 def write_job_file(output_dir, job_name, contents):
-    """Write the rendered template to the target directory."""
-    ensure_directory(output_dir)
+    """Write the rendered template to an existing target directory."""
     destination = os.path.join(output_dir, '{0}.inp'.format(job_name))
     LOGGER.debug('Writing job file {0}'.format(destination))
     with open(destination, 'w') as handle:
@@ -141,12 +235,16 @@ def main(argv=None):
 
     try:
         template_text = load_template(args.template)
-        parameter_sets = read_parameter_table(args.params)
+        compiled = compile_template(template_text)
+        header, rows = read_parameter_table(args.params)
+        bound = bind_template(compiled, header)
+        name_columns = resolve_name_columns(header)
+        ensure_directory(args.jobs_dir)
         generated_paths = []
-        for index, parameters in enumerate(parameter_sets):
-            job_name = determine_job_name(parameters, index)
+        for index, row in enumerate(rows):
+            job_name = determine_row_job_name(name_columns, row, index)
             LOGGER.info('Rendering template for job {0}'.format(job_name))
-            rendered = render_template(template_text, parameters)
+            rendered = apply_row(bound, row)
             destination = write_job_file(args.jobs_dir, job_name, rendered)
             generated_paths.append(destination)
         LOGGER.info('Successfully generated {0} job file(s).'.format(len(generated_paths)))
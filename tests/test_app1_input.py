@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the replacement helpers of the Streamlit app."""
+
+import importlib.util
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+def _install_stub(name, **attributes):
+    """Register a minimal stand-in for an optional UI dependency."""
+    try:
+        __import__(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+
+
+def _load_app():
+    _install_stub(
+        'streamlit',
+        cache_data=lambda *args, **kwargs: (lambda func: func),
+        session_state={},
+    )
+    _install_stub('pandas', DataFrame=dict)
+    path = os.path.join(os.path.dirname(__file__), os.pardir, 'scripts', 'app1-input.py')
+    spec = importlib.util.spec_from_file_location('app1_input', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+app1_input = _load_app()
+
+
+def _target(target_index, text, replacements):
+    return {
+        'target_index': target_index,
+        'text': text,
+        'replacements': [{'index': index, 'text': value} for index, value in replacements],
+    }
+
+
+class MakeReplacerTests(unittest.TestCase):
+
+    def test_counts_each_target(self):
+        replacer = app1_input.make_replacer('AAA bbb AAA', ['AAA', 'bbb'], '完全一致')
+        self.assertEqual(replacer(['x', 'y']), ('x y x', [2, 1]))
+
+    def test_single_literal_target(self):
+        replacer = app1_input.make_replacer('a-a-b', ['a'], '完全一致')
+        self.assertEqual(replacer(['z']), ('z-z-b', [2]))
+
+    def test_absent_single_target_returns_zero_count(self):
+        replacer = app1_input.make_replacer('abc', ['zz'], '完全一致')
+        self.assertEqual(replacer(['q']), ('abc', [0]))
+
+    def test_replacements_are_not_replaced_again(self):
+        replacer = app1_input.make_replacer('A B', ['A', 'B'], '完全一致')
+        self.assertEqual(replacer(['B', 'C']), ('B C', [1, 1]))
+
+    def test_overlapping_targets_prefer_earliest_match(self):
+        replacer = app1_input.make_replacer('xABAB', ['AB', 'xA'], '完全一致')
+        self.assertEqual(replacer(['1', '2']), ('2B1', [1, 1]))
+
+    def test_partial_mode_ignores_case(self):
+        replacer = app1_input.make_replacer('aaa AAA bbb', ['AaA', 'BBB'], '部分一致')
+        self.assertEqual(replacer(['x', 'y']), ('x x y', [2, 1]))
+
+    def test_exact_mode_is_case_sensitive(self):
+        replacer = app1_input.make_replacer('aaa AAA', ['AAA', 'aaa'], '完全一致')
+        self.assertEqual(replacer(['X', 'Y']), ('Y X', [1, 1]))
+
+    def test_replacement_backslashes_are_literal(self):
+        replacer = app1_input.make_replacer('dir=@DIR@', ['@DIR@', 'x'], '部分一致')
+        self.assertEqual(replacer(['C:\\temp\\1', 'y'])[0], 'dir=C:\\temp\\1')
+
+    def test_bytes_path_encodes_targets_and_replacements(self):
+        base = u'日本 AAA\r\n'.encode('utf-8')
+        replacer = app1_input.make_replacer(base, ['AAA', u'日本'], '完全一致', 'utf-8')
+        updated, counts = replacer(['1', u'東京'])
+        self.assertEqual(updated, u'東京 1\r\n'.encode('utf-8'))
+        self.assertEqual(counts, [1, 1])
+
+
+class GenerateFilesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        session_state = types.SimpleNamespace(template_name='model.inp')
+        patcher = mock.patch.object(app1_input, 'st', types.SimpleNamespace(session_state=session_state))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temp_dir))
+
+    def _combinations(self):
+        return list(app1_input.LazyCartesian([
+            _target(1, 'AAA', [(1, 'x1'), (2, 'x2')]),
+            _target(2, 'bbb', [(1, 'y1'), (2, 'y1')]),
+        ]))
+
+    def test_writes_every_selected_combination(self):
+        successful, skipped = app1_input.generate_files(
+            self._combinations(), 'AAA bbb', self.temp_dir, '完全一致', 'utf-8')
+        self.assertEqual((successful, skipped), (4, []))
+        self.assertEqual((self.temp_dir / 'model_(2-2).inp').read_text(), 'x2 y1')
+
+    def test_absent_target_skips_all_combinations(self):
+        successful, skipped = app1_input.generate_files(
+            self._combinations(), 'AAA only', self.temp_dir, '完全一致', 'utf-8')
+        self.assertEqual((successful, skipped), (0, ['1-1', '1-2', '2-1', '2-2']))
+        self.assertEqual(list(self.temp_dir.iterdir()), [])
+
+    def test_partial_mode_skips_unmatched_combinations(self):
+        successful, skipped = app1_input.generate_files(
+            self._combinations(), 'aaa only', self.temp_dir, '部分一致', 'utf-8')
+        self.assertEqual((successful, skipped), (0, ['1-1', '1-2', '2-1', '2-2']))
+
+
+class LazyCartesianTests(unittest.TestCase):
+
+    def setUp(self):
+        self.targets = [
+            _target(1, 'A', [(1, 'a1'), (3, 'a3')]),
+            _target(2, 'B', [(1, 'b1'), (2, 'b2'), (4, 'b4')]),
+            _target(4, 'C', [(2, 'c2')]),
+        ]
+        self.combinations = app1_input.LazyCartesian(self.targets)
+        self.expected = list(itertools.product(*[target['replacements'] for target in self.targets]))
+
+    def test_length_is_product_of_candidates(self):
+        self.assertEqual(len(self.combinations), 6)
+        self.assertEqual(len(app1_input.LazyCartesian([])), 0)
+        self.assertEqual(list(app1_input.LazyCartesian([])), [])
+
+    def test_getitem_follows_product_order(self):
+        for index, product in enumerate(self.expected):
+            combo = self.combinations[index]
+            self.assertEqual([pair['replacement'] for pair in combo['pairs']], list(product))
+            self.assertEqual([pair['target'] for pair in combo['pairs']], self.targets)
+        self.assertEqual(list(self.combinations), [self.combinations[i] for i in range(6)])
+
+    def test_label_matches_candidate_numbers(self):
+        labels = ['-'.join(str(item['index']) for item in product) for product in self.expected]
+        self.assertEqual([self.combinations.label(i) for i in range(6)], labels)
+        self.assertEqual(self.combinations[4]['label'], '3-2-2')
+        self.assertEqual(self.combinations.label(-1), '3-4-2')
+
+    def test_out_of_range_index_raises(self):
+        with self.assertRaises(IndexError):
+            self.combinations[6]
+        with self.assertRaises(IndexError):
+            self.combinations.label(-7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,12 +18,55 @@ class AppGenRenderTests(unittest.TestCase):
         self.assertIn('Job: TestJob', rendered)
         self.assertIn('NAME=Value', rendered)
 
+    def test_render_template_replaces_repeated_tokens(self):
+        template = "{{A}}-{{B}}-{{A}}"
+        params = {'A': 1, 'B': 'x'}
+        self.assertEqual(app_gen.render_template(template, params), '1-x-1')
+
+    def test_render_template_same_text_with_different_parameters(self):
+        template = "E={{E}}"
+        self.assertEqual(app_gen.render_template(template, {'E': '210'}), 'E=210')
+        self.assertEqual(app_gen.render_template(template, {'E': '70'}), 'E=70')
+
+    def test_compile_template_without_tokens(self):
+        self.assertEqual(app_gen.compile_template("*HEADING"), (['*HEADING'], [], []))
+
+    def test_compile_template_splits_segments_and_tokens(self):
+        segments, tokens, required = app_gen.compile_template("a{{X}}b{{Y}}{{X}}")
+        self.assertEqual(segments, ['a', 'b', '', ''])
+        self.assertEqual(tokens, ['X', 'Y', 'X'])
+        self.assertEqual(required, ['X', 'Y'])
+
+    def test_apply_template_reuses_compiled_template(self):
+        compiled = app_gen.compile_template("*PARAM, E={{E}}")
+        self.assertEqual(app_gen.apply_template(compiled, {'E': '210'}), '*PARAM, E=210')
+        self.assertEqual(app_gen.apply_template(compiled, {'E': '70'}), '*PARAM, E=70')
+
+    def test_apply_row_uses_bound_columns(self):
+        compiled = app_gen.compile_template("{{B}}/{{A}}/{{B}}")
+        bound = app_gen.bind_template(compiled, ['A', 'B'])
+        self.assertEqual(app_gen.apply_row(bound, ('1', '2')), '2/1/2')
+
+    def test_apply_row_missing_column_raises(self):
+        compiled = app_gen.compile_template("{{A}} {{C}}")
+        bound = app_gen.bind_template(compiled, ['A', 'B'])
+        with self.assertRaises(KeyError):
+            app_gen.apply_row(bound, ('1', '2'))
+        with self.assertRaises(KeyError):
+            app_gen.apply_row(app_gen.bind_template(app_gen.compile_template("{{B}}"), ['A', 'B']), ('1',))
+
     def test_render_template_missing_token_raises(self):
         template = "*HEADING\n** Job: {{JOB_NAME}}"
         params = {}
         with self.assertRaises(KeyError):
             app_gen.render_template(template, params)
 
+    def test_render_template_reports_each_missing_token_once(self):
+        template = "{{A}} {{B}} {{A}}"
+        with self.assertRaises(KeyError) as context:
+            app_gen.render_template(template, {'B': None})
+        self.assertIn('A, B', str(context.exception))
+
 
 class AppGenNameTests(unittest.TestCase):
 
@@ -35,6 +78,11 @@ class AppGenNameTests(unittest.TestCase):
         params = {}
         self.assertEqual(app_gen.determine_job_name(params, 1), 'case_002')
 
+    def test_determine_row_job_name_uses_preferred_columns(self):
+        name_columns = app_gen.resolve_name_columns(['E', 'case', 'job_name'])
+        self.assertEqual(app_gen.determine_row_job_name(name_columns, ('1', 'c1', ''), 0), 'c1')
+        self.assertEqual(app_gen.determine_row_job_name(name_columns, ('1', '', ' '), 2), 'case_003')
+
     def test_sanitize_job_name_replaces_invalid_characters(self):
         self.assertEqual(app_gen.sanitize_job_name('My Job!*'), 'My_Job_')
 
@@ -47,13 +95,29 @@ class AppGenFileTests(unittest.TestCase):
     def tearDown(self):
         shutil.rmtree(self.temp_dir)
 
-    def test_write_job_file_creates_directory_and_writes(self):
-        output_dir = os.path.join(self.temp_dir, 'jobs')
-        path = app_gen.write_job_file(output_dir, 'case_001', 'content')
+    def test_write_job_file_writes_contents(self):
+        path = app_gen.write_job_file(self.temp_dir, 'case_001', 'content')
         self.assertTrue(os.path.isfile(path))
         with open(path, 'r') as handle:
             self.assertEqual(handle.read(), 'content')
 
+    def test_main_creates_jobs_directory_and_writes_all_jobs(self):
+        template_path = os.path.join(self.temp_dir, 'template.inp')
+        params_path = os.path.join(self.temp_dir, 'sweep.csv')
+        jobs_dir = os.path.join(self.temp_dir, 'jobs')
+        with open(template_path, 'w') as handle:
+            handle.write('*HEADING\n** E={{E}}\n')
+        with open(params_path, 'w') as handle:
+            handle.write('job_name,E\nsteel,210\nalu,70\n')
+
+        result = app_gen.main(['--template', template_path, '--params', params_path,
+                               '--jobs-dir', jobs_dir])
+
+        self.assertEqual(result, 0)
+        self.assertEqual(sorted(os.listdir(jobs_dir)), ['alu.inp', 'steel.inp'])
+        with open(os.path.join(jobs_dir, 'alu.inp'), 'r') as handle:
+            self.assertEqual(handle.read(), '*HEADING\n** E=70\n')
+
 
 if __name__ == '__main__':
     unittest.main()